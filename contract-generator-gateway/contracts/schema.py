@@ -0,0 +1,49 @@
+from django.urls import reverse
+from drf_yasg import openapi
+from drf_yasg.generators import OpenAPISchemaGenerator
+
+
+STREAM_CONTRACT_OPERATION = openapi.Operation(
+    operation_id="contracts_stream",
+    summary="Stream contract generation",
+    description=(
+        "Streams the generated contract as server-sent events. Keepalive comments are sent "
+        "while the AI service is still working. Errors that occur after streaming has started "
+        "are sent as `{\"error\": ..., \"type\": \"error\"}` events."
+    ),
+    parameters=[
+        openapi.Parameter(
+            'prompt',
+            openapi.IN_QUERY,
+            description="Business context in plain language",
+            type=openapi.TYPE_STRING,
+            required=True,
+        )
+    ],
+    responses=openapi.Responses({
+        "200": openapi.Response("text/event-stream"),
+        "400": openapi.Response("Bad Request - Invalid or missing prompt"),
+        "429": openapi.Response("Too Many Requests - AI service rate limit exceeded"),
+        "500": openapi.Response("Internal Server Error - Unexpected error"),
+        "502": openapi.Response("Bad Gateway - AI service error"),
+        "503": openapi.Response("Service Unavailable - AI service unavailable"),
+        "504": openapi.Response("Gateway Timeout - AI service timed out"),
+    }),
+    produces=["text/event-stream", "application/json"],
+    tags=["contracts"],
+)
+
+
+class ContractsSchemaGenerator(OpenAPISchemaGenerator):
+    """
+    Schema generator that also documents the stream endpoint.
+
+    stream_contract is a plain async Django view, which drf-yasg does not
+    introspect, so its operation is added to the generated paths by hand.
+    """
+
+    def get_paths(self, endpoints, components, request, public):
+        paths, prefix = super().get_paths(endpoints, components, request, public)
+        stream_path = reverse('stream-contract')
+        paths['/' + stream_path.lstrip('/')] = openapi.PathItem(get=STREAM_CONTRACT_OPERATION)
+        return paths, prefix
@@ -1,67 +1,251 @@
 from django.test import TestCase
 from rest_framework import status
+import asyncio
 import json
+import httpx
 from unittest.mock import patch, MagicMock
-from contracts.utils.validators import InputValidator
+from contracts.utils.validators import InputValidator, _validate_sanitized_prompt_cached
 
 
 class StreamContractViewTests(TestCase):
-    @patch('contracts.views.httpx.stream')
-    def test_stream_contract_success_with_valid_prompt(self, mock_stream):
+    async def _read_stream(self, response):
+        """Collect the body of a streaming response served from an async iterator"""
+        return b''.join([chunk async for chunk in response.streaming_content])
+
+    def _mock_upstream(self, mock_stream, chunks=()):
+        """Wire a patched CLIENT.stream to an upstream response yielding chunks"""
+        mock_response = MagicMock(is_error=False)
+        mock_response.aiter_bytes.return_value.__aiter__.return_value = list(chunks)
+        mock_stream.return_value.__aenter__.return_value = mock_response
+        return mock_response
+
+    @patch('contracts.views.CLIENT.stream')
+    async def test_stream_contract_success_with_valid_prompt(self, mock_stream):
         """Test successful streaming with valid prompt parameter"""
-        mock_response = MagicMock()
-        mock_response.iter_lines.return_value = [
+        self._mock_upstream(mock_stream, [
             b'{"candidates": [{"content": {"parts": [{"text": "Test contract content"}]}}]}'
-        ]
-        mock_stream.return_value.__enter__.return_value = mock_response
+        ])
 
-        response = self.client.get('/api/contracts/stream/', {
+        response = await self.async_client.get('/api/contracts/stream/', {
             'prompt': 'Draft ToS for a cloud SaaS company'
         })
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response['Content-Type'], 'text/event-stream')
         
-        content = b''.join(response.streaming_content)
+        content = await self._read_stream(response)
         content_str = content.decode('utf-8')
-        self.assertIn('data: b\'{"candidates": [{"content": {"parts": [{"text": "Test contract content"}]}}]}\'', content_str)
+        self.assertIn('data: {"candidates": [{"content": {"parts": [{"text": "Test contract content"}]}}]}\n\n', content_str)
+
+    async def test_stream_contract_frames_complete_lines(self):
+        """Test that upstream bytes split at arbitrary offsets are framed as whole-line events"""
+        body = '[{"text": "§ 1 Definitions — the Customer’s data"}\r\n,{"text": "Zürich"}]'.encode('utf-8')
+        split_at = body.index('§'.encode('utf-8')) + 1  # inside the two-byte "§"
+
+        async def upstream_chunks():
+            yield body[:split_at]
+            await asyncio.sleep(0)
+            yield body[split_at:body.index(b'\r\n') + 1]
+            yield body[body.index(b'\r\n') + 1:]
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, content=upstream_chunks())
+        ))
+        with patch('contracts.views.CLIENT', client):
+            response = await self.async_client.get('/api/contracts/stream/', {
+                'prompt': 'Draft terms of service for my SaaS company'
+            })
+            content_str = (await self._read_stream(response)).decode('utf-8')
+
+        self.assertEqual(
+            content_str,
+            'data: [{"text": "§ 1 Definitions — the Customer’s data"}\n\n'
+            'data: ,{"text": "Zürich"}]\n\n'
+        )
+
+    @patch('contracts.views._KEEPALIVE_INTERVAL', 0.01)
+    @patch('contracts.views.CLIENT.stream')
+    async def test_stream_contract_sends_keepalive_while_upstream_is_idle(self, mock_stream):
+        """Test that keepalive comments are sent while waiting for slow upstream chunks"""
+        async def slow_chunks():
+            await asyncio.sleep(0.05)
+            yield b'{"candidates": []}'
+
+        self._mock_upstream(mock_stream).aiter_bytes.side_effect = slow_chunks
+
+        response = await self.async_client.get('/api/contracts/stream/', {
+            'prompt': 'Draft terms of service for my SaaS company'
+        })
+
+        content_str = (await self._read_stream(response)).decode('utf-8')
+        self.assertTrue(content_str.startswith(': keepalive\n\n'))
+        self.assertTrue(content_str.endswith('data: {"candidates": []}\n\n'))
+
+    @patch('contracts.views._KEEPALIVE_INTERVAL', 0.01)
+    @patch('contracts.views.CLIENT.stream')
+    async def test_stream_contract_sends_keepalive_while_upstream_is_opening(self, mock_stream):
+        """Test that the response starts with keepalives while upstream headers are pending"""
+        mock_response = self._mock_upstream(mock_stream, [b'{"candidates": []}\n'])
+
+        async def slow_open(*args):
+            await asyncio.sleep(0.05)
+            return mock_response
+
+        mock_stream.return_value.__aenter__.side_effect = slow_open
+
+        response = await self.async_client.get('/api/contracts/stream/', {
+            'prompt': 'Draft terms of service for my SaaS company'
+        })
 
-    @patch('contracts.views.httpx.stream')
-    def test_stream_contract_success_with_empty_response(self, mock_stream):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content_str = (await self._read_stream(response)).decode('utf-8')
+        self.assertTrue(content_str.startswith(': keepalive\n\n'))
+        self.assertTrue(content_str.endswith('data: {"candidates": []}\n\n'))
+
+    @patch('contracts.views._KEEPALIVE_INTERVAL', 0.01)
+    @patch('contracts.views.CLIENT.stream')
+    async def test_stream_contract_late_upstream_failure_is_error_event(self, mock_stream):
+        """Test that upstream failures after the stream has started are sent as error events"""
+        async def slow_failure(*args):
+            await asyncio.sleep(0.05)
+            raise httpx.ConnectError("connection refused")
+
+        mock_stream.return_value.__aenter__.side_effect = slow_failure
+
+        response = await self.async_client.get('/api/contracts/stream/', {
+            'prompt': 'Draft terms of service for my SaaS company'
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content_str = (await self._read_stream(response)).decode('utf-8')
+        self.assertTrue(content_str.startswith(': keepalive\n\n'))
+        error_data = json.loads(content_str.split('\n\n')[-2][len('data: '):])
+        self.assertIn("connect", error_data["error"])
+
+    @patch('contracts.views.CLIENT.stream')
+    async def test_stream_contract_success_with_empty_response(self, mock_stream):
         """Test successful streaming even with empty response from API"""
-        mock_response = MagicMock()
-        mock_response.iter_lines.return_value = []
-        mock_stream.return_value.__enter__.return_value = mock_response
+        self._mock_upstream(mock_stream)
 
-        response = self.client.get('/api/contracts/stream/', {
+        response = await self.async_client.get('/api/contracts/stream/', {
             'prompt': 'Draft terms of service for my SaaS company'
         })
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response['Content-Type'], 'text/event-stream')
         
-        content = b''.join(response.streaming_content)
+        content = await self._read_stream(response)
         content_str = content.decode('utf-8')
         self.assertEqual(content_str.strip(), '')
 
+    @patch('contracts.views.CLIENT.stream')
+    async def test_stream_contract_request_body_escapes_prompt(self, mock_stream):
+        """Test that the upstream request body is valid JSON containing the prompt"""
+        self._mock_upstream(mock_stream)
+        prompt = 'Terms of service for my "Acme" SaaS company\nbased in Zürich'
+
+        response = await self.async_client.get('/api/contracts/stream/', {'prompt': prompt})
+        await self._read_stream(response)
+
+        payload = json.loads(mock_stream.call_args.kwargs['content'])
+        text = payload["contents"][0]["parts"][0]["text"]
+        self.assertTrue(text.startswith("You are a legal AI assistant."))
+        self.assertTrue(text.endswith(f"Business context: {prompt}"))
+
     def test_stream_contract_failure_missing_prompt(self):
         """Test failure when prompt parameter is missing"""
         response = self.client.get('/api/contracts/stream/')
         
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(response.content), {"error": "Prompt is required and cannot be empty"})
+
+    @patch('contracts.views.CLIENT.stream')
+    def test_stream_contract_requires_asgi(self, mock_stream):
+        """Test that streaming fails fast with a clear error when served over WSGI"""
+        response = self.client.get('/api/contracts/stream/', {
+            'prompt': 'Draft terms of service for my SaaS company'
+        })
+        
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertIn("ASGI", json.loads(response.content)["error"])
+        mock_stream.assert_not_called()
+
+    def test_stream_contract_is_documented_in_swagger(self):
+        """Test that the stream endpoint appears in the generated OpenAPI schema"""
+        response = self.client.get('/swagger.json')
+        
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        operation = json.loads(response.content)["paths"]["/api/contracts/stream/"]["get"]
+        self.assertEqual([param["name"] for param in operation["parameters"]], ["prompt"])
+        self.assertIn("400", operation["responses"])
+
+    def test_stream_contract_rejects_non_get(self):
+        """Test that only GET is allowed on the stream endpoint"""
+        response = self.client.post('/api/contracts/stream/', {'prompt': 'Terms of service for my SaaS company'})
+        
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    @patch('contracts.views.CLIENT.stream')
+    async def test_stream_contract_error_event_is_valid_json(self, mock_stream):
+        """Test that errors raised mid-stream are sent as JSON-encoded events"""
+        async def failing_chunks():
+            yield b'{"candidates": []}\n'
+            raise httpx.ReadTimeout("read timed out")
+
+        self._mock_upstream(mock_stream).aiter_bytes.side_effect = failing_chunks
+
+        response = await self.async_client.get('/api/contracts/stream/', {
+            'prompt': 'Draft terms of service for my software company'
+        })
+
+        content_str = (await self._read_stream(response)).decode('utf-8')
+        events = content_str.split('\n\n')
+        self.assertEqual(events[0], 'data: {"candidates": []}')
+        error_data = json.loads(events[1][len('data: '):])
+        self.assertEqual(error_data["type"], "error")
+        self.assertIn("timeout", error_data["error"].lower())
+        mock_stream.return_value.__aexit__.assert_awaited_once()
+
+    @patch('contracts.views.CLIENT.stream')
+    async def test_stream_contract_upstream_connect_error(self, mock_stream):
+        """Test that upstream connection failures return an HTTP error before streaming"""
+        mock_stream.return_value.__aenter__.side_effect = httpx.ConnectError("connection refused")
+
+        response = await self.async_client.get('/api/contracts/stream/', {
+            'prompt': 'Draft terms of service for my software company'
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn("connect", json.loads(response.content)["error"])
+
+    @patch('contracts.views.CLIENT.stream')
+    async def test_stream_contract_upstream_rate_limited(self, mock_stream):
+        """Test that an upstream 429 is returned as a 429 response"""
+        upstream_response = httpx.Response(
+            429, content=b'{"error": "quota"}', request=httpx.Request("POST", "https://ai.example.com")
+        )
+        mock_stream.return_value.__aenter__.return_value = upstream_response
+
+        response = await self.async_client.get('/api/contracts/stream/', {
+            'prompt': 'Draft terms of service for my software company'
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn("Rate limit", json.loads(response.content)["error"])
+        mock_stream.return_value.__aexit__.assert_awaited_once()
 
-    @patch('contracts.views.httpx.stream')
-    def test_stream_contract_failure_api_error(self, mock_stream):
-        """Test handling of API errors during streaming"""
+    @patch('contracts.views.CLIENT.stream')
+    async def test_stream_contract_failure_api_error(self, mock_stream):
+        """Test handling of unexpected errors when calling the API"""
         mock_stream.side_effect = Exception("API connection error")
 
-        response = self.client.get('/api/contracts/stream/', {
+        response = await self.async_client.get('/api/contracts/stream/', {
             'prompt': 'Draft terms of service for my software company'
         })
         
-        with self.assertRaises(Exception):
-            b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertIn("error", json.loads(response.content))
     
     def test_stream_contract_failure_invalid_business_prompt(self):
         """Test failure when prompt doesn't contain business context"""
@@ -86,6 +270,10 @@ class StreamContractViewTests(TestCase):
 class InputValidatorTests(TestCase):
     """Test cases for InputValidator class"""
     
+    def setUp(self):
+        # Cached results from earlier tests would skip the checks patched below
+        _validate_sanitized_prompt_cached.cache_clear()
+    
     def test_validate_prompt_input_valid_business_prompts(self):
         """Test validation with valid business-related prompts"""
         valid_prompts = [
@@ -221,3 +409,69 @@ class InputValidatorTests(TestCase):
         special_char_prompt = "Draft terms of service for my e-commerce store (online business)!"
         result = InputValidator.validate_prompt_input(special_char_prompt)
         self.assertEqual(result, special_char_prompt.strip())
+
+    def test_validate_prompt_input_repeated_prompt_is_cached(self):
+        """Test that repeated prompts reuse the cached result, including rejections"""
+        valid_prompt = "Privacy policy for a hotel booking platform"
+        invalid_prompt = "hello there how are you"
+        
+        InputValidator.validate_prompt_input(valid_prompt)
+        with self.assertRaises(ValueError):
+            InputValidator.validate_prompt_input(invalid_prompt)
+        
+        with patch.object(InputValidator, '_validate_business_context') as mock_check:
+            self.assertEqual(InputValidator.validate_prompt_input(valid_prompt), valid_prompt)
+            with self.assertRaises(ValueError) as context:
+                InputValidator.validate_prompt_input(invalid_prompt)
+            mock_check.assert_not_called()
+        self.assertIn("Please provide information about your business", str(context.exception))
+    
+    def test_validate_prompt_input_cache_keyed_on_sanitized_prompt(self):
+        """Test that whitespace variants share a cache entry and oversized prompts are not cached"""
+        prompt = "Refund policy for an online bakery store"
+        InputValidator.validate_prompt_input(prompt)
+        
+        with patch.object(InputValidator, '_validate_business_context') as mock_check:
+            self.assertEqual(InputValidator.validate_prompt_input(f"  {prompt}\n"), prompt)
+            mock_check.assert_not_called()
+        
+        cache_size = _validate_sanitized_prompt_cached.cache_info().currsize
+        with self.assertRaises(ValueError):
+            InputValidator.validate_prompt_input("a" * 10001)
+        self.assertEqual(_validate_sanitized_prompt_cached.cache_info().currsize, cache_size)
+    
+    def test_validate_prompt_input_mostly_non_letters(self):
+        """Test that prompts made mostly of digits or symbols are rejected before pattern matching"""
+        with patch.object(InputValidator, '_NON_BUSINESS_RE') as mock_patterns:
+            with self.assertRaises(ValueError) as context:
+                InputValidator.validate_prompt_input("$$$ 12345 67890 !!! saas")
+            mock_patterns.search.assert_not_called()
+        self.assertIn("Please provide information about your business", str(context.exception))
+    
+    def test_validate_prompt_input_plural_business_keywords(self):
+        """Test that plural forms of business keywords count towards the business context"""
+        plural_prompts = [
+            "Mobile apps for restaurants and cafes in Lagos",
+            "We build websites for dentists and accept payments from customers",
+            "Shopify stores selling handmade candles to customers",
+        ]
+        
+        for prompt in plural_prompts:
+            with self.subTest(prompt=prompt):
+                result = InputValidator.validate_prompt_input(prompt)
+                self.assertEqual(result, prompt)
+    
+    def test_validate_prompt_input_derived_business_keywords(self):
+        """Test that words starting with a business keyword count towards the business context"""
+        derived_prompts = [
+            "I run a consulting practice in Lagos",
+            "A freelance graphic designer portfolio",
+            "Marketplace connecting freelancers with startups",
+            "Mobile application for food ordering and delivery",
+            "Contest platform for designers",
+        ]
+        
+        for prompt in derived_prompts:
+            with self.subTest(prompt=prompt):
+                result = InputValidator.validate_prompt_input(prompt)
+                self.assertEqual(result, prompt)
@@ -1,6 +1,6 @@
 from django.urls import path
-from .views import StreamContractView
+from .views import stream_contract
 
 urlpatterns = [
-    path('stream/', StreamContractView.as_view(), name='stream-contract'),
+    path('stream/', stream_contract, name='stream-contract'),
 ]
@@ -1,10 +1,23 @@
+import functools
 import logging
 import re
+import string
+from collections import Counter
+from itertools import chain
 from django.conf import settings
 
 GEMINI_API_KEY = settings.GEMINI_API_KEY
 URL = settings.URL
 
+
+def _prefix_keywords(keywords):
+    """Map each keyword to every keyword it starts with, itself included."""
+    return {
+        keyword: frozenset(other for other in keywords if keyword.startswith(other))
+        for keyword in keywords
+    }
+
+
 class InputValidator:
     """Handles user input validation."""
     
@@ -37,6 +50,28 @@ class InputValidator:
         r'^[a-zA-Z]{1,3}$',  
     ]
     
+    # Compiled once at import so each request is a single pass of the regex engine
+    _NON_BUSINESS_RE = re.compile(
+        "|".join(f"(?:{pattern})" for pattern in NON_BUSINESS_PATTERNS), re.IGNORECASE
+    )
+    # Deletes letters and spaces, leaving only the characters counted against a prompt
+    _NON_LETTER_TABLE = str.maketrans("", "", string.ascii_letters + " ")
+    _NON_BUSINESS_MESSAGE = (
+        "Please provide information about your business, company, or service. "
+        "Your input should describe what your business does or what kind of contract you need."
+    )
+    _WORD_RE = re.compile(r"[a-z]+")
+    _ALL_KEYWORDS = frozenset(chain.from_iterable(BUSINESS_KEYWORDS.values()))
+    _LEGAL_KEYWORDS = frozenset(BUSINESS_KEYWORDS['legal_terms'])
+    # Keywords count when a word starts with them, so "designers" and "freelancers" still match.
+    # Longest first so "services" is matched as itself rather than as "service".
+    _KEYWORD_RE = re.compile(
+        r"\b(" + "|".join(sorted(map(re.escape, _ALL_KEYWORDS), key=len, reverse=True)) + ")"
+    )
+    # A keyword listed under several categories counts once per category
+    _KEYWORD_WEIGHTS = Counter(chain.from_iterable(BUSINESS_KEYWORDS.values()))
+    _KEYWORD_PREFIXES = _prefix_keywords(_ALL_KEYWORDS)
+    
     @staticmethod
     def validate_prompt_input(prompt: str, max_length: int = 10000) -> str:
         """
@@ -57,9 +92,18 @@ class InputValidator:
         
         sanitized_prompt = prompt.strip()
         
+        # Checked before the cache so oversized prompts are never stored in it
         if len(sanitized_prompt) > max_length:
             raise ValueError(f"Prompt is too long. Maximum {max_length} characters allowed")
         
+        is_valid, result = _validate_sanitized_prompt_cached(sanitized_prompt)
+        if not is_valid:
+            raise ValueError(result)
+        return result
+    
+    @staticmethod
+    def _validate_sanitized_prompt(sanitized_prompt: str) -> str:
+        """Uncached content checks for a stripped prompt within the length limit."""
         if len(sanitized_prompt) < 10:
             raise ValueError("Prompt is too short. Please provide more details about your business or service")
         
@@ -78,39 +122,55 @@ class InputValidator:
         Raises:
             ValueError: If prompt doesn't contain business context
         """
+        non_letters = len(prompt.translate(InputValidator._NON_LETTER_TABLE))
+        if non_letters * 2 > len(prompt):
+            raise ValueError(InputValidator._NON_BUSINESS_MESSAGE)
+        
         prompt_lower = prompt.lower()
         
-        for pattern in InputValidator.NON_BUSINESS_PATTERNS:
-            if re.search(pattern, prompt_lower, re.IGNORECASE):
-                raise ValueError(
-                    "Please provide information about your business, company, or service. "
-                    "Your input should describe what your business does or what kind of contract you need."
-                )
+        if InputValidator._NON_BUSINESS_RE.search(prompt_lower):
+            raise ValueError(InputValidator._NON_BUSINESS_MESSAGE)
         
-        business_score = 0
-        all_keywords = []
+        # One tokenization pass feeds the length, repetition and keyword checks
+        words = InputValidator._WORD_RE.findall(prompt_lower)
+        word_count = len(words)
         
-        for category, keywords in InputValidator.BUSINESS_KEYWORDS.items():
-            for keyword in keywords:
-                if keyword in prompt_lower:
-                    business_score += 1
-                    all_keywords.append(keyword)
+        if word_count < 3:
+            raise ValueError("Please provide a more detailed description of your business or service needs")
+        
+        if len(set(words)) < word_count * 0.3:  
+            raise ValueError("Please provide more varied and specific information about your business")
+        
+        # The regex scan runs in C; only the distinct hits are expanded in Python
+        keyword_prefixes = InputValidator._KEYWORD_PREFIXES
+        matched_keywords = set().union(
+            *(keyword_prefixes[hit] for hit in set(InputValidator._KEYWORD_RE.findall(prompt_lower)))
+        )
+        business_score = sum(InputValidator._KEYWORD_WEIGHTS[keyword] for keyword in matched_keywords)
         
         if business_score < 2:
-            legal_terms_found = any(term in prompt_lower for term in InputValidator.BUSINESS_KEYWORDS['legal_terms'])
+            legal_terms_found = not InputValidator._LEGAL_KEYWORDS.isdisjoint(matched_keywords)
             
             if not legal_terms_found:
                 raise ValueError(
                     "Please provide more specific information about your business or service. "
                     "Include details like: what type of business you have, what services you provide, "
                     "or what kind of contract you need (terms of service, privacy policy, etc.). "
-                    f"Found keywords: {', '.join(all_keywords) if all_keywords else 'none'}"
+                    f"Found keywords: {', '.join(sorted(matched_keywords)) if matched_keywords else 'none'}"
                 )
-        
-        words = prompt.split()
-        if len(words) < 3:
-            raise ValueError("Please provide a more detailed description of your business or service needs")
-        
-        if len(set(words)) < len(words) * 0.3:  
-            raise ValueError("Please provide more varied and specific information about your business")
 
+
+@functools.lru_cache(maxsize=1024)
+def _validate_sanitized_prompt_cached(sanitized_prompt: str):
+    """
+    Memoize validation outcomes, including rejections, for repeated prompts.
+    
+    Keyed on the stripped prompt so whitespace variants share an entry.
+    
+    Returns:
+        (True, sanitized_prompt) or (False, error_message)
+    """
+    try:
+        return True, InputValidator._validate_sanitized_prompt(sanitized_prompt)
+    except ValueError as e:
+        return False, str(e)
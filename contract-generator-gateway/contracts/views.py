@@ -1,119 +1,224 @@
+import asyncio
 import httpx
 import logging
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from rest_framework import status
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
-from django.http import StreamingHttpResponse
+import orjson
+from contextlib import AsyncExitStack
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseNotAllowed, StreamingHttpResponse
 from .utils.validators import InputValidator, GEMINI_API_KEY, URL
 
 logger = logging.getLogger(__name__)
 
+# Shared across requests so TLS sessions and HTTP/2 connections to the AI service are reused.
+# Connections are closed with the process; the pool is only valid on the ASGI server's event loop.
+CLIENT = httpx.AsyncClient(
+    http2=True,
+    timeout=httpx.Timeout(300.0, connect=10.0),
+    limits=httpx.Limits(max_keepalive_connections=100, max_connections=200),
+)
 
-class StreamContractView(APIView):
+# Request options that never change between calls; httpx copies them rather than mutating.
+_HEADERS = {"Content-Type": "application/json"}
+_PARAMS = {"key": GEMINI_API_KEY}
+
+# SSE comment sent while the AI service is silent so proxies don't drop the idle connection
+_KEEPALIVE_INTERVAL = 15.0
+_KEEPALIVE_FRAME = b": keepalive\n\n"
+
+_SYS_STREAM = "You are a legal AI assistant. Write a long HTML Terms of Service. Business context: "
+
+# The request body only varies by the user prompt, so it is spliced into pre-encoded JSON.
+_TEMPLATE_PRE = b'{"contents":[{"parts":[{"text":' + orjson.dumps(_SYS_STREAM)[:-1]
+_TEMPLATE_POST = b'"}]}]}'
+
+
+def _json_response(data, status):
+    """Build a JSON response encoded with orjson"""
+    return HttpResponse(orjson.dumps(data), status=status, content_type="application/json")
+
+
+def _format_error(message):
+    """Format error message as a server-sent event"""
+    return b"data: " + orjson.dumps({"error": message, "type": "error"}) + b"\n\n"
+
+
+async def _sse_events(chunks):
+    """
+    Frame upstream bytes as server-sent events, one event per non-empty line.
+
+    Chunks arrive at arbitrary byte offsets, so a partial line is held back until
+    its newline arrives; multi-byte characters and JSON lines are never split.
+    """
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer += chunk
+        end = buffer.rfind(b"\n")
+        if end == -1:
+            continue
+        lines = bytes(buffer[:end]).split(b"\n")
+        del buffer[:end + 1]
+        events = b"".join(b"data: " + line + b"\n\n" for line in map(bytes.strip, lines) if line)
+        if events:
+            yield events
+    if buffer.strip():
+        yield b"data: " + bytes(buffer).strip() + b"\n\n"
+
+
+async def _open_upstream(body):
+    """
+    Send the generation request and wait for the upstream response headers.
+
+    Returns the open response and the exit stack that closes it. Error statuses
+    raise HTTPStatusError once the error body has been read for logging.
+    """
+    upstream = AsyncExitStack()
+    try:
+        response = await upstream.enter_async_context(CLIENT.stream(
+            "POST", 
+            URL, 
+            headers=_HEADERS, 
+            params=_PARAMS, 
+            content=body
+        ))
+        if response.is_error:
+            await response.aread()
+        response.raise_for_status()
+    except BaseException:
+        await upstream.aclose()
+        raise
+    return response, upstream
+
+
+def _upstream_error(exc):
+    """Log a failure talking to the AI service and map it to (HTTP status, message)"""
+    if isinstance(exc, httpx.TimeoutException):
+        logger.error("Request timeout when calling API")
+        return 504, "Request timeout. Please try again."
+    if isinstance(exc, httpx.ConnectError):
+        logger.error("Connection error when calling API")
+        return 503, "Unable to connect to AI service. Please try again later."
+    if isinstance(exc, httpx.HTTPStatusError):
+        logger.error(f"HTTP error from API: {exc.response.status_code} - {exc.response.text}")
+        if exc.response.status_code == 401:
+            return 502, "Authentication failed. Please check API configuration."
+        elif exc.response.status_code == 429:
+            return 429, "Rate limit exceeded. Please try again later."
+        elif exc.response.status_code >= 500:
+            return 503, "AI service is temporarily unavailable. Please try again later."
+        return 502, "AI service error. Please try again."
+    if isinstance(exc, httpx.RequestError):
+        logger.error(f"Request error when calling API: {str(exc)}")
+        return 502, "Network error. Please check your connection and try again."
+    logger.error(f"Unexpected error when calling API: {str(exc)}")
+    return 500, "An unexpected error occurred. Please try again."
+
+
+async def _keepalive_until_done(task):
+    """Yield keepalive comments until task finishes; the task is never cancelled"""
+    while not task.done():
+        await asyncio.wait({task}, timeout=_KEEPALIVE_INTERVAL)
+        if not task.done():
+            yield _KEEPALIVE_FRAME
+
+
+async def _event_stream(opening):
+    """
+    Stream the upstream response as server-sent events.
+
+    Keepalives cover both the wait for the upstream response headers and any
+    silence between chunks. Failures after the response has started are sent as
+    error events.
+    """
+    upstream = None
+    next_events = None
+    try:
+        async for frame in _keepalive_until_done(opening):
+            yield frame
+        response, upstream = opening.result()
+
+        # Forward upstream bytes as soon as they arrive; aiter_bytes() without a
+        # chunk_size does not hold data back to fill a fixed-size block.
+        events = _sse_events(response.aiter_bytes()).__aiter__()
+        while True:
+            next_events = asyncio.ensure_future(events.__anext__())
+            async for frame in _keepalive_until_done(next_events):
+                yield frame
+            try:
+                frame = next_events.result()
+            except StopAsyncIteration:
+                break
+            finally:
+                next_events = None
+            yield frame
+    except Exception as e:
+        _, message = _upstream_error(e)
+        yield _format_error(message)
+    finally:
+        if next_events is not None:
+            next_events.cancel()
+        if upstream is None:
+            opening.cancel()
+            if opening.done() and not opening.cancelled() and opening.exception() is None:
+                upstream = opening.result()[1]
+        if upstream is not None:
+            await upstream.aclose()
+
+
+async def stream_contract(request):
     """
     Stream contract generation
+
+    Documented in the Swagger schema by contracts.schema.STREAM_CONTRACT_OPERATION.
     """
-    @swagger_auto_schema(
-        manual_parameters=[
-            openapi.Parameter(
-                'prompt',
-                openapi.IN_QUERY,
-                description="Business context in plain language",
-                type=openapi.TYPE_STRING,
-                required=True,
-            )
-        ],
-        responses={
-            200: "text/event-stream",
-            400: "Bad Request - Invalid or missing prompt",
-            500: "Internal Server Error - API or service unavailable"
-        }
-    )
-    def get(self, request):
+    # require_GET only wraps sync views on Django 4.2
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+
+    try:
         try:
-            try:
-                user_prompt = InputValidator.validate_prompt_input(request.GET.get("prompt", ""))
-            except ValueError as e:
-                logger.warning(f"Invalid prompt input: {str(e)}")
-                return Response(
-                    {"error": str(e)},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            logger.info(f"Starting contract generation for prompt: {user_prompt[:100]}...")
-
-            payload = {
-                "contents": [{
-                    "parts": [{
-                        "text": f"You are a legal AI assistant. Write a long HTML Terms of Service. "
-                                f"Business context: {user_prompt}"
-                    }]
-                }]
-            }
+            user_prompt = InputValidator.validate_prompt_input(request.GET.get("prompt", ""))
+        except ValueError as e:
+            logger.warning(f"Invalid prompt input: {str(e)}")
+            return _json_response({"error": str(e)}, status=400)
 
-            def event_stream():
-                try:
-                    url = URL
-                    headers = {"Content-Type": "application/json"}
-                    params = {"key": GEMINI_API_KEY}
-
-                    timeout = httpx.Timeout(300.0, connect=10.0)
-
-                    with httpx.stream(
-                        "POST", 
-                        url, 
-                        headers=headers, 
-                        params=params, 
-                        json=payload, 
-                        timeout=timeout
-                    ) as response:
-                        response.raise_for_status()
-                        
-                        for line in response.iter_lines():
-                            if line:
-                                yield f"data: {line}\n\n"
-                                
-                except httpx.TimeoutException:
-                    logger.error("Request timeout when calling API")
-                    yield f"data: {self._format_error('Request timeout. Please try again.')}\n\n"
-                except httpx.ConnectError:
-                    logger.error("Connection error when calling API")
-                    yield f"data: {self._format_error('Unable to connect to AI service. Please try again later.')}\n\n"
-                except httpx.HTTPStatusError as e:
-                    logger.error(f"HTTP error from API: {e.response.status_code} - {e.response.text}")
-                    if e.response.status_code == 401:
-                        yield f"data: {self._format_error('Authentication failed. Please check API configuration.')}\n\n"
-                    elif e.response.status_code == 429:
-                        yield f"data: {self._format_error('Rate limit exceeded. Please try again later.')}\n\n"
-                    elif e.response.status_code >= 500:
-                        yield f"data: {self._format_error('AI service is temporarily unavailable. Please try again later.')}\n\n"
-                    else:
-                        yield f"data: {self._format_error('AI service error. Please try again.')}\n\n"
-                except httpx.RequestError as e:
-                    logger.error(f"Request error when calling API: {str(e)}")
-                    yield f"data: {self._format_error('Network error. Please check your connection and try again.')}\n\n"
-                except Exception as e:
-                    logger.error(f"Unexpected error in event stream: {str(e)}")
-                    yield f"data: {self._format_error('An unexpected error occurred. Please try again.')}\n\n"
-
-            return StreamingHttpResponse(
-                event_stream(), 
-                content_type="text/event-stream",
-                headers={
-                    'Cache-Control': 'no-cache',
-                    'X-Accel-Buffering': 'no' 
-                }
+        # CLIENT's pooled connections belong to the server's event loop. Under WSGI
+        # (e.g. manage.py runserver) every request and stream runs on a throwaway loop.
+        if not isinstance(request, ASGIRequest):
+            logger.error("stream_contract requires an ASGI server such as uvicorn")
+            return _json_response(
+                {"error": "Streaming is only available when the API is served over ASGI."},
+                status=500
             )
 
-        except Exception as e:
-            logger.error(f"Unexpected error in StreamContractView: {str(e)}")
-            return Response(
-                {"error": "An unexpected error occurred. Please try again."},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        logger.info(f"Starting contract generation for prompt: {user_prompt[:100]}...")
+
+        body = _TEMPLATE_PRE + orjson.dumps(user_prompt)[1:-1] + _TEMPLATE_POST
+
+        opening = asyncio.ensure_future(_open_upstream(body))
+        # Failures before the first keepalive is due are reported with an HTTP status.
+        # After that the event stream starts, so proxies see traffic while the AI
+        # service is still generating and has not sent its response headers yet.
+        try:
+            await asyncio.wait({opening}, timeout=_KEEPALIVE_INTERVAL)
+        except BaseException:
+            opening.cancel()
+            raise
+        if opening.done() and opening.exception() is not None:
+            status_code, message = _upstream_error(opening.exception())
+            return _json_response({"error": message}, status=status_code)
+
+        return StreamingHttpResponse(
+            _event_stream(opening), 
+            content_type="text/event-stream",
+            headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no' 
+            }
+        )
 
-    def _format_error(self, message):
-        """Format error message for streaming response"""
-        return f'{{"error": "{message}", "type": "error"}}'
\ No newline at end of file
+    except Exception as e:
+        logger.error(f"Unexpected error in stream_contract: {str(e)}")
+        return _json_response(
+            {"error": "An unexpected error occurred. Please try again."},
+            status=500
+        )
@@ -14,3 +14,12 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "gateway.settings")
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+# The ASGI handler does not serve static files itself (runserver did), so serve the
+# Swagger UI and admin assets in development.
+if settings.DEBUG:
+    from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+
+    application = ASGIStaticFilesHandler(application)
@@ -3,6 +3,7 @@ from django.urls import path, include, re_path
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from contracts.schema import ContractsSchemaGenerator
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -14,6 +15,7 @@ schema_view = get_schema_view(
         license=openapi.License(name="MIT License"),
     ),
     public=True,
+    generator_class=ContractsSchemaGenerator,
     permission_classes=[permissions.AllowAny],
 )
 